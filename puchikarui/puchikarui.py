@@ -9,12 +9,17 @@
 
 import os
 import sys
+import keyword
 import sqlite3
 from collections import namedtuple
 from collections import Mapping
 from typing import Sequence
 import logging
 import functools
+from contextlib import contextmanager
+from itertools import starmap, chain
+from operator import attrgetter
+from urllib.parse import urlparse, unquote
 
 
 # -------------------------------------------------------------
@@ -22,8 +27,184 @@ import functools
 # -------------------------------------------------------------
 
 
+@functools.lru_cache(maxsize=256)
+def _nt(name, columns):
+    """ [Internal] Create (or reuse) a namedtuple class for a table """
+    return namedtuple(name, columns, rename=True)
+
+
+@functools.lru_cache(maxsize=256)
+def _make_record(name, columns):
+    """ [Internal] Create (or reuse) a light-weight record class with __slots__
+
+    Record objects do not carry a __dict__ and can be accessed by attribute, index or column name.
+    Invalid column names are renamed the same way namedtuple does (_0, _1, etc.)
+    __init__ and __iter__ are generated with one plain slot access per field, e.g.
+
+    >>> def __init__(_self, ID, name):
+    ...     _self.ID = ID
+    ...     _self.name = name
+    """
+    fields = _nt(name, columns)._fields
+    # field names never start with an underscore (except renamed _0, _1, ...), so _self cannot clash with them
+    args = ', '.join(fields)
+    lines = [f"def __init__(_self, {args}):" if fields else "def __init__(_self):"]
+    lines += [f"    _self.{f} = {f}" for f in fields] or ["    pass"]
+    lines.append("def __iter__(_self):")
+    lines.append("    return iter(({}))".format(''.join(f"_self.{f}, " for f in fields)))
+    namespace = {}
+    exec('\n'.join(lines), namespace)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return getattr(self, key)
+        elif isinstance(key, slice):
+            return tuple(self)[key]
+        return getattr(self, self.__slots__[key])
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def __eq__(self, other):
+        if isinstance(other, type(self)):
+            return tuple(self) == tuple(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return "{}({})".format(name, ', '.join('{}={}'.format(f, repr(getattr(self, f))) for f in self.__slots__))
+
+    attrs = {'__slots__': fields, '_fields': fields, '__init__': namespace['__init__'],
+             '__iter__': namespace['__iter__'], '__getitem__': __getitem__, '__len__': __len__,
+             '__eq__': __eq__, '__repr__': __repr__,
+             # records are mutable, so they must not be hashable by value
+             '__hash__': None}
+    return type(name, (object,), attrs)
+
+
+def _is_attr_name(name):
+    """ [Internal] Check if a name can be used as a plain attribute (obj.name) """
+    return name.isidentifier() and not keyword.iskeyword(name)
+
+
+@functools.lru_cache(maxsize=256)
+def _attrgetter(fields):
+    """ [Internal] Create (or reuse) a function which returns a tuple of attribute values of an object """
+    if not fields:
+        return lambda obj: ()
+    elif not all(_is_attr_name(f) for f in fields):
+        # attrgetter treats dotted names as nested lookups, read such attributes literally
+        return lambda obj: tuple(getattr(obj, f) for f in fields)
+    elif len(fields) == 1:
+        _get = attrgetter(fields[0])
+        return lambda obj: (_get(obj),)
+    return attrgetter(*fields)
+
+
+def _values_getter(table, columns, field_map=None):
+    """ [Internal] Get a function which returns values of columns from an object as a tuple """
+    if isinstance(table, Table) and (not field_map or field_map is table._field_map):
+        return table._getter_for(columns, mapped=bool(field_map))
+    if isinstance(columns, str):
+        columns = columns.split()
+    if field_map:
+        return _attrgetter(tuple(field_map.get(c, c) for c in columns))
+    return _attrgetter(tuple(columns))
+
+
+def _assign_lines(fields, target, row, indent='    '):
+    """ [Internal] Generate source code lines which assign row values to object attributes """
+    lines = []
+    for idx, f in enumerate(fields):
+        if _is_attr_name(f):
+            lines.append(f"{indent}{target}.{f} = {row}[{idx}]")
+        else:
+            lines.append(f"{indent}setattr({target}, {repr(f)}, {row}[{idx}])")
+    return lines
+
+
+@functools.lru_cache(maxsize=256)
+def _obj_loader(fields):
+    """ [Internal] Generate (or reuse) a function which loads a row tuple into an object
+
+    The generated function has one plain attribute assignment per field, e.g.
+
+    >>> def _load(obj, row):
+    ...     obj.ID = row[0]
+    ...     obj.name = row[1]
+    ...     return obj
+    """
+    source = '\n'.join(['def _load(obj, row):'] + _assign_lines(fields, 'obj', 'row') + ['    return obj'])
+    namespace = {}
+    exec(source, namespace)
+    return namespace['_load']
+
+
+@functools.lru_cache(maxsize=256)
+def _batch_loader(fields):
+    """ [Internal] Generate (or reuse) a function which loads many row tuples into new proto objects """
+    lines = ['def _load_batch(proto, rows):',
+             '    out = []',
+             '    append = out.append',
+             '    for row in rows:',
+             '        obj = proto()']
+    lines += _assign_lines(fields, 'obj', 'row', indent='        ')
+    lines += ['        append(obj)',
+              '    return out']
+    namespace = {}
+    exec('\n'.join(lines), namespace)
+    return namespace['_load_batch']
+
+
+def _connect(path, **kwargs):
+    """ [Internal] Connect to a database file or an SQLite URI (file:...) """
+    path = str(path)
+    return sqlite3.connect(path, uri=path.startswith('file:'), **kwargs)
+
+
+def _db_file(path):
+    """ [Internal] Get the file of a database path or an SQLite URI (None for in-memory databases) """
+    path = str(path)
+    if path.startswith('file:'):
+        uri = urlparse(path)
+        if uri.path == ':memory:' or 'mode=memory' in uri.query:
+            return None
+        return unquote(uri.path)
+    return None if path == ':memory:' else path
+
+
+def _is_connected(conn):
+    """ [Internal] Check if an sqlite3 connection is still open """
+    try:
+        conn.total_changes
+        return True
+    except sqlite3.ProgrammingError:
+        return False
+
+
+def _columns_key(columns):
+    """ [Internal] Make a hashable cache key from a columns argument (None for default columns) """
+    if not columns:
+        return None
+    return columns if isinstance(columns, (str, tuple)) else tuple(columns)
+
+
+def _intern_all(names):
+    """ [Internal] Intern column names so that lookups by name can use pointer comparison """
+    return [sys.intern(n) if type(n) is str else n for n in names]
+
+
+def _valid_fields(columns):
+    """ [Internal] Check if all column names can be used as namedtuple fields without renaming """
+    seen = set()
+    for c in columns:
+        if not isinstance(c, str) or not c.isidentifier() or keyword.iskeyword(c) or c.startswith('_') or c in seen:
+            return False
+        seen.add(c)
+    return True
+
+
 def update_obj(source, target, *fields, **field_map):
-    source_dict = source.__dict__ if hasattr(source, '__dict__') else source
+    source_dict = getattr(source, '__dict__', source)
     if not fields:
         fields = source_dict.keys()
     for f in fields:
@@ -33,7 +214,7 @@ def update_obj(source, target, *fields, **field_map):
 
 def to_obj(cls, obj_data=None, *fields, **field_map):
     """ prioritize obj_dict when there are conficts """
-    obj_dict = obj_data.__dict__ if hasattr(obj_data, '__dict__') else obj_data
+    obj_dict = getattr(obj_data, '__dict__', obj_data)
     if not fields:
         fields = obj_dict.keys()
     obj = cls()
@@ -88,32 +269,35 @@ def normal_mode(cur):
 
 class Table:
     def __init__(self, name, *columns, data_source=None, proto=None, id_cols: Sequence = None,
-                 strict_mode=False, **field_map):
+                 strict_mode=False, use_record=False, **field_map):
         """ Contains information of a table in the database
             strict_mode -- Warn users if a bad database design is detected (defaulted to False)
+            use_record -- Use light-weight __slots__ records instead of namedtuples for rows (defaulted to False)
         """
         self._strict_mode = strict_mode
+        self._use_record = use_record
         self.name = name
         self.columns = []
+        # loaders and getters resolved for this table, keyed on (kind, columns)
+        self._cache = {}
         self.add_fields(*columns)
         self._data_source = data_source
         self._proto = proto
         if not id_cols:
             self._id_cols = []
         elif isinstance(id_cols, str):
-            self._id_cols = id_cols.split()
+            self._id_cols = _intern_all(id_cols.split())
         else:
-            self._id_cols = id_cols
+            self._id_cols = _intern_all(id_cols)
+        self._id_where = self._build_id_where()
         self._field_map = field_map
 
     def add_fields(self, *columns):
-        self.columns.extend(columns)
-        if self._strict_mode:
-            try:
-                namedtuple(self.name, self.columns, rename=False)
-            except Exception as ex:
-                logging.getLogger(__name__).warning("WARNING: Bad database design detected (Table: %s (%s)" % (self.name, self.columns))
-        self.template = namedtuple(self.name, self.columns, rename=True)
+        self.columns.extend(_intern_all(columns))
+        self._cache.clear()
+        if self._strict_mode and not _valid_fields(self.columns):
+            logging.getLogger(__name__).warning("WARNING: Bad database design detected (Table: %s (%s)" % (self.name, self.columns))
+        self.template = self._template_for(self.columns)
         return self
 
     @property
@@ -121,15 +305,22 @@ class Table:
         return self._id_cols
 
     def set_id(self, *id_cols):
-        self._id_cols.extend(id_cols)
+        self._id_cols.extend(_intern_all(id_cols))
+        self._id_where = self._build_id_where()
+        self._cache.clear()
         return self
 
+    def _build_id_where(self):
+        """ [Internal] Build the WHERE clause to find a record by its ID columns """
+        return ' AND '.join(f'{c}=?' for c in self._id_cols)
+
     def set_proto(self, proto):
         self._proto = proto
         return self
 
     def field_map(self, **field_map):
         self._field_map.update(field_map)
+        self._cache.clear()
         return self
 
     def __repr__(self):
@@ -138,8 +329,43 @@ class Table:
     def __str__(self):
         return repr(self)
 
-    def to_table(self, row_tuples, columns=None):
-        return [self.to_obj(x, columns) for x in row_tuples]
+    def _template_for(self, columns, use_record=None):
+        """ [Internal] Get a cached row class (namedtuple or record) for a subset of columns """
+        if isinstance(columns, str):
+            columns = columns.split()
+        if use_record is None:
+            use_record = self._use_record
+        return _make_record(self.name, tuple(columns)) if use_record else _nt(self.name, tuple(columns))
+
+    def to_table(self, row_tuples, columns=None, use_record=None):
+        """ Convert row tuples into objects (or rows if proto is not available)
+
+            use_record -- Use light-weight __slots__ records instead of namedtuples when proto is not set
+                          (defaulted to the table's setting)
+        """
+        return self._materialize(row_tuples, list, columns=columns, use_record=use_record)
+
+    def _materialize(self, row_tuples, container, columns=None, use_record=None):
+        """ [Internal] Convert row tuples into a container (list or tuple) of objects or rows
+
+        Rows are built straight into the container so that no intermediate list is created
+        """
+        if isinstance(row_tuples, (list, tuple)) and not row_tuples:
+            return container()
+        if self._proto:
+            objs = self._batch_loader_for(columns)(self._proto, row_tuples)
+            # the generated loader fills a list, converting it to a tuple only copies pointers
+            return objs if container is list else container(objs)
+        if columns or (use_record is not None and use_record != self._use_record):
+            template = self._template_for(columns or self.columns, use_record)
+        else:
+            template = self.template
+        # namedtuple._make() creates rows directly from tuples (tuple.__new__) without repacking arguments,
+        # it is on par with starmap() on Python 3.6-3.9 and slightly faster on 3.11+
+        make = getattr(template, '_make', None)
+        if make is not None:
+            return container(map(make, row_tuples))
+        return container(starmap(template, row_tuples))
 
     def to_row(self, row_tuple, template=None):
         if template:
@@ -151,71 +377,116 @@ class Table:
         # fall back to row_tuple
         if not self._proto:
             if columns:
-                new_tuples = namedtuple(self.name, columns, rename=True)
-                return self.to_row(row_tuple, new_tuples)
+                return self.to_row(row_tuple, self._template_for(columns))
             else:
                 return self.to_row(row_tuple)
         # else create objects
-        if not columns:
+        return self._loader_for(columns)(self._proto(), row_tuple)
+
+    def _loader_for(self, columns=None):
+        """ [Internal] Get a cached function which loads a row tuple into a proto object """
+        key = ('load', _columns_key(columns))
+        loader = self._cache.get(key)
+        if loader is None:
+            loader = self._cache[key] = _obj_loader(self._proto_fields(columns))
+        return loader
+
+    def _batch_loader_for(self, columns=None):
+        """ [Internal] Get a cached function which loads many row tuples into proto objects """
+        key = ('batch', _columns_key(columns))
+        loader = self._cache.get(key)
+        if loader is None:
+            loader = self._cache[key] = _batch_loader(self._proto_fields(columns))
+        return loader
+
+    def _getter_for(self, columns=None, mapped=True):
+        """ [Internal] Get a cached function which returns values of columns from an object as a tuple
+
+            mapped -- Read attribute names from field map instead of column names
+        """
+        key = ('get', _columns_key(columns), mapped)
+        getter = self._cache.get(key)
+        if getter is None:
+            if mapped:
+                fields = self._proto_fields(columns)
+            else:
+                fields = tuple(columns.split() if isinstance(columns, str) else columns or self.columns)
+            getter = self._cache[key] = _attrgetter(fields)
+        return getter
+
+    def _id_getter(self):
+        """ [Internal] Get a cached function which returns values of ID columns from an object as a tuple """
+        getter = self._cache.get(('id',))
+        if getter is None:
+            getter = self._cache[('id',)] = _attrgetter(tuple(self._id_cols))
+        return getter
+
+    def _proto_fields(self, columns=None):
+        """ [Internal] Get proto attribute names of columns (after field mapping) """
+        if isinstance(columns, str):
+            columns = columns.split()
+        elif not columns:
             columns = self.columns
-        new_obj = to_obj(self._proto, dict(zip(columns, row_tuple)), *columns, **self._field_map)
-        # assign values
-        return new_obj
+        return tuple(self._field_map.get(c, c) for c in columns)
 
     def ctx(self, ctx) -> 'TableContext':
         return TableContext(self, ctx)
 
-    def __ds_ctx(self) -> 'TableContext':
-        return getattr(self._data_source, self.name)
+    def __table_ctx(self, ctx=None) -> 'TableContext':
+        """ [Internal] Get a table context from ctx, or from the default context of the data source if ctx is None """
+        return getattr(self._data_source, self.name) if ctx is None else self.ctx(ctx)
 
     def select_single(self, where=None, values=None, orderby=None, limit=None, columns=None, ctx=None):
-        ctx = self.__ds_ctx() if ctx is None else self.ctx(ctx)
-        return ctx.select_single(where=where, values=values, orderby=orderby, limit=limit, columns=columns)
+        """ Select the first matched record (limit is kept for backward compatibility and ignored) """
+        return self.__table_ctx(ctx).select_single(where=where, values=values, orderby=orderby, columns=columns)
 
     def select(self, where=None, values=None, orderby=None, limit=None, columns=None, ctx=None):
-        ctx = self.__ds_ctx() if ctx is None else self.ctx(ctx)
-        return ctx.select(where, values, orderby=orderby, limit=limit, columns=columns)
+        return self.__table_ctx(ctx).select(where, values, orderby=orderby, limit=limit, columns=columns)
 
     def select_iter(self, where=None, values=None, orderby=None, limit=None, columns=None, ctx=None):
-        ctx = self.__ds_ctx() if ctx is None else self.ctx(ctx)
-        return ctx.select_iter(where, values, orderby=orderby, limit=limit, columns=columns)
+        return self.__table_ctx(ctx).select_iter(where, values, orderby=orderby, limit=limit, columns=columns)
 
     def insert(self, *values, columns=None, ctx=None):
-        ctx = self.__ds_ctx() if ctx is None else self.ctx(ctx)
-        return ctx.insert(*values, columns=columns)
+        return self.__table_ctx(ctx).insert(*values, columns=columns)
+
+    def insert_many(self, rows, columns=None, ctx=None):
+        return self.__table_ctx(ctx).insert_many(rows, columns=columns)
 
     def delete(self, where=None, values=None, ctx=None):
-        ctx = self.__ds_ctx() if ctx is None else self.ctx(ctx)
-        return ctx.delete(where=where, values=values)
+        return self.__table_ctx(ctx).delete(where=where, values=values)
 
     def delete_obj(self, obj, ctx=None):
-        ctx = self.__ds_ctx() if ctx is None else self.ctx(ctx)
-        return ctx.delete_obj(obj)
+        return self.__table_ctx(ctx).delete_obj(obj)
 
     def update(self, set_expr, where='', values=None, ctx=None):
-        ctx = self.__ds_ctx() if ctx is None else self.ctx(ctx)
-        return ctx.update(set_expr, where=where, values=values)
+        return self.__table_ctx(ctx).update(set_expr, where=where, values=values)
 
     def update_record(self, new_values, where='', where_values=None, columns=None, ctx=None):
-        ctx = self.__ds_ctx() if ctx is None else self.ctx(ctx)
-        ctx.update_record(new_values, where, where_values, columns)
+        self.__table_ctx(ctx).update_record(new_values, where, where_values, columns)
 
     def by_id(self, *args, columns=None, ctx=None):
-        ctx = self.__ds_ctx() if ctx is None else self.ctx(ctx)
-        return ctx.by_id(*args, columns=columns)
+        return self.__table_ctx(ctx).by_id(*args, columns=columns)
 
     def save(self, obj, columns=None, ctx=None):
-        ctx = self.__ds_ctx() if ctx is None else self.ctx(ctx)
-        return ctx.save(obj, columns)
+        return self.__table_ctx(ctx).save(obj, columns)
 
 
 class DataSource:
 
-    def __init__(self, db_path, schema=None, auto_expand_path=True):
+    def __init__(self, db_path, schema=None, auto_expand_path=True, pragmas=None, cached_statements=256):
+        """ A data source which opens connections to an SQLite database file
+
+            pragmas -- PRAGMA settings to apply to every new connection of a file database (none by default),
+                       e.g. {'journal_mode': 'WAL', 'synchronous': 'NORMAL'} for faster writes.
+                       Note that journal_mode=WAL is persistent and changes the database file for good.
+            cached_statements -- Number of prepared statements each connection keeps in its cache
+        """
         self.auto_expand_path = auto_expand_path
         self.path = db_path
         self._script_file_map = {}
         self.schema = schema
+        self.pragmas = dict(pragmas) if pragmas else {}
+        self.cached_statements = cached_statements
         self.__default_ctx_obj = None
 
     def __del__(self):
@@ -240,6 +511,15 @@ class DataSource:
                 self._script_file_map[path] = script_file.read()
         return self._script_file_map[path]
 
+    def _apply_pragmas(self, exe):
+        """ [Internal] Apply PRAGMA settings to a new connection """
+        for name, value in self.pragmas.items():
+            try:
+                exe.cur.execute(f"PRAGMA {name}={value}")
+            except sqlite3.OperationalError:
+                # e.g. journal_mode cannot be changed on a read-only database
+                logging.getLogger(__name__).warning(f"PRAGMA {name}={value} could not be applied to {self.path}")
+
     def _setup(self, exe, schema):
         """ [Internal] Setup a newly created database """
         logging.getLogger(__name__).warning("DB does not exist at {}. Setup is required.".format(self.path))
@@ -259,13 +539,26 @@ class DataSource:
             schema = self.schema
         if auto_commit is None and schema is not None:
             auto_commit = schema.auto_commit
-        exe = ExecutionContext(self.path, schema=schema, auto_commit=auto_commit)
         # setup DB if required
-        if self.path and (str(self.path) == ':memory:' or
-                          not os.path.isfile(self.path) or os.path.getsize(self.path) == 0):
+        db_file = _db_file(self.path) if self.path else None
+        setup_required = self.path and (db_file is None or not os.path.isfile(db_file) or os.path.getsize(db_file) == 0)
+        exe = ExecutionContext(self.path, schema=schema, auto_commit=auto_commit, cached_statements=self.cached_statements)
+        # pragmas (e.g. journal_mode) may write the database header, so check for setup before applying them
+        if db_file is not None:
+            self._apply_pragmas(exe)
+        if setup_required:
             self._setup(exe, schema)
         return exe
 
+    def close(self):
+        """ Close the default reusable connection (if it was opened)
+
+        A new default connection will be opened when it is needed again
+        """
+        if self.__default_ctx_obj is not None:
+            self.__default_ctx_obj.close()
+            self.__default_ctx_obj = None
+
     def __default_ctx(self):
         """ Create a default reusable connection """
         if self.__default_ctx_obj is None:
@@ -282,17 +575,21 @@ class MemorySource(DataSource):
     def __init__(self, db_path, *args, **kwargs):
         super().__init__(db_path, *args, **kwargs)
         self.__conn = None
+        self.__transaction = _TransactionState()
 
     def open(self, auto_commit=None, schema=None, force_iterdump=False, **kwargs):
         if schema is None:
             schema = self.schema
         if auto_commit is None and schema is not None:
             auto_commit = schema.auto_commit
+        if self.__conn is not None and not _is_connected(self.__conn):
+            # the shared connection was closed by one of its contexts
+            self.__drop_conn()
         if self.__conn is None:
             logging.getLogger(__name__).info(f"Fetching database into :memory: from file [{self.path}]")
             # fetch from datasource
-            source = sqlite3.connect(str(self.path))
-            self.__conn = sqlite3.connect(":memory:")
+            source = _connect(self.path)
+            self.__conn = sqlite3.connect(":memory:", cached_statements=self.cached_statements)
             if sys.version_info < (3, 7) or force_iterdump:
                 __cur = self.__conn.cursor()
                 __cur.execute("PRAGMA synchronous=OFF")
@@ -303,18 +600,103 @@ class MemorySource(DataSource):
                 # use backup if possible
                 source.backup(self.__conn)
             source.close()
-        return ExecutionContext(self.__conn, schema=schema, auto_commit=auto_commit)
+        exe = ExecutionContext(self.__conn, schema=schema, auto_commit=auto_commit)
+        exe._transaction = self.__transaction
+        return exe
+
+    def close(self):
+        """ Close the default connection and drop the in-memory copy of the database
+
+        The database will be fetched from file again on the next open()
+        """
+        super().close()
+        self.__drop_conn()
+
+    def __drop_conn(self):
+        if self.__conn is not None:
+            self.__conn.close()
+            self.__conn = None
+            self.__transaction = _TransactionState()
+
+
+@functools.lru_cache(maxsize=512)
+def _build_select(table_name, columns, where, orderby, limit):
+    """ [Internal] Build (or reuse) a SELECT query """
+    query = []
+    query.append("SELECT ")
+    query.append(','.join(columns) if columns else '*')
+    query.append(" FROM ")
+    query.append(table_name)
+    if where:
+        query.append(" WHERE ")
+        query.append(where)
+    if orderby:
+        query.append(" ORDER BY ")
+        query.append(orderby)
+    if limit:
+        query.append(" LIMIT ")
+        query.append(str(limit))
+    return ''.join(query)
+
+
+@functools.lru_cache(maxsize=512)
+def _build_insert(table_name, value_count, columns):
+    """ [Internal] Build (or reuse) an INSERT query """
+    if columns:
+        if value_count < len(columns):
+            column_names = ','.join(columns[-value_count:])
+        else:
+            column_names = ','.join(columns)
+        query = "INSERT INTO %s (%s) VALUES (%s) " % (table_name, column_names, ','.join(['?'] * value_count))
+    else:
+        query = "INSERT INTO %s VALUES (%s) " % (table_name, ','.join(['?'] * value_count))
+    return query
+
+
+@functools.lru_cache(maxsize=512)
+def _build_update_record(table_name, where, columns):
+    """ [Internal] Build (or reuse) an UPDATE query which sets a list of columns """
+    set_fields = []
+    for col in columns:
+        set_fields.append("{c}=?".format(c=col))
+    if where:
+        query = 'UPDATE {t} SET {sf} WHERE {where}'.format(t=table_name, sf=', '.join(set_fields), where=where)
+    else:
+        query = 'UPDATE {t} SET {sf}'.format(t=table_name, sf=', '.join(set_fields))
+    return query
+
+
+@functools.lru_cache(maxsize=512)
+def _build_delete(table_name, where):
+    """ [Internal] Build (or reuse) a DELETE query """
+    if where:
+        query = "DELETE FROM {tbl} WHERE {where}".format(tbl=table_name, where=where)
+    else:
+        query = "DELETE FROM {tbl}".format(tbl=table_name)
+    return query
+
+
+@functools.lru_cache(maxsize=512)
+def _build_update(table_name, set_expr, where):
+    """ [Internal] Build (or reuse) an UPDATE query from a SET expression """
+    if not where and not where.strip():
+        return f"UPDATE {table_name} SET {set_expr}"
+    else:
+        return f"UPDATE {table_name} SET {set_expr} WHERE {where}"
 
 
 class QueryBuilder(object):
 
-    """ Default query builder """
+    """ Default query builder
+
+    Generated queries are cached by table name, columns and query clauses
+    so that repeated calls with the same arguments do not rebuild SQL strings
+    """
     def __init__(self, schema):
         self.schema = schema
 
     @classmethod
     def build_select(cls, table, where=None, orderby=None, limit=None, columns=None) -> str:
-        query = []
         if isinstance(columns, str):
             columns = columns.split()
         if isinstance(table, Table):
@@ -323,20 +705,7 @@ class QueryBuilder(object):
             table_name = table.name
         else:
             table_name = str(table)
-        query.append("SELECT ")
-        query.append(','.join(columns) if columns else '*')
-        query.append(" FROM ")
-        query.append(table_name)
-        if where:
-            query.append(" WHERE ")
-            query.append(where)
-        if orderby:
-            query.append(" ORDER BY ")
-            query.append(orderby)
-        if limit:
-            query.append(" LIMIT ")
-            query.append(str(limit))
-        return ''.join(query)
+        return _build_select(table_name, tuple(columns) if columns else None, where, orderby, limit)
 
     @classmethod
     def build_insert(cls, table, values, columns=None) -> str:
@@ -349,48 +718,26 @@ class QueryBuilder(object):
             table_name = str(table)
         if isinstance(columns, str):
             columns = columns.split()
-        if columns:
-            if len(values) < len(columns):
-                column_names = ','.join(columns[-len(values):])
-            else:
-                column_names = ','.join(columns)
-            query = "INSERT INTO %s (%s) VALUES (%s) " % (table_name, column_names, ','.join(['?'] * len(values)))
-        else:
-            query = "INSERT INTO %s VALUES (%s) " % (table_name, ','.join(['?'] * len(values)))
-        return query
+        return _build_insert(table_name, len(values), tuple(columns) if columns else None)
 
     @classmethod
     def build_update_record(cls, table, where='', columns=None) -> str:
         table_name = table.name if isinstance(table, Table) else str(table)
         if columns is None:
             columns = table.columns
-        set_fields = []
         if isinstance(columns, str):
             columns = columns.split()
-        for col in columns:
-            set_fields.append("{c}=?".format(c=col))
-        if where:
-            query = 'UPDATE {t} SET {sf} WHERE {where}'.format(t=table_name, sf=', '.join(set_fields), where=where)
-        else:
-            query = 'UPDATE {t} SET {sf}'.format(t=table_name, sf=', '.join(set_fields))
-        return query
+        return _build_update_record(table_name, where, tuple(columns))
 
     @classmethod
     def build_delete(cls, table, where=None) -> str:
         table_name = table.name if isinstance(table, Table) else str(table)
-        if where:
-            query = "DELETE FROM {tbl} WHERE {where}".format(tbl=table_name, where=where)
-        else:
-            query = "DELETE FROM {tbl}".format(tbl=table_name)
-        return query
+        return _build_delete(table_name, where)
 
     @classmethod
     def build_update(cls, table, set_expr, where):
         table_name = table.name if isinstance(table, Table) else str(table)
-        if not where and not where.strip():
-            return f"UPDATE {table_name} SET {set_expr}"
-        else:
-            return f"UPDATE {table_name} SET {set_expr} WHERE {where}"
+        return _build_update(table_name, set_expr, where)
 
 
 class TableContext(object):
@@ -408,12 +755,15 @@ class TableContext(object):
         return self._context.select_iter(self._table, where, values, **kwargs)
 
     def select_single(self, where=None, values=None, **kwargs):
-        result = next(self._context.select_iter(self._table, where, values, **kwargs), None)
-        return result
+        kwargs.pop('limit', None)
+        return self._context.select_single(self._table, where, values, **kwargs)
 
     def insert(self, *values, columns=None):
         return self._context.insert_record(self._table, values, columns)
 
+    def insert_many(self, rows, columns=None):
+        return self._context.insert_many(self._table, rows, columns)
+
     def update_record(self, new_values, where='', where_values=None, columns=None):
         return self._context.update_record(self._table, new_values, where, where_values, columns)
 
@@ -441,17 +791,25 @@ class TableContext(object):
         return self._context.update(self._table, set_expr, where=where, values=values)
 
 
+class _TransactionState(object):
+    """ [Internal] Transaction status shared by all execution contexts of a connection """
+    __slots__ = ('active',)
+
+    def __init__(self):
+        self.active = False
+
+
 class ExecutionContext(object):
     """ Create a context to work with a schema which closes connection when destroyed
     """
     def __init__(self, source, schema: 'Database',
-                 auto_commit=True, row_factory=sqlite3.Row):
+                 auto_commit=True, row_factory=sqlite3.Row, cached_statements=256):
         if isinstance(source, sqlite3.Connection):
             # reuse connection object
             self.conn = source
         else:
             # create a new connection object
-            self.conn = sqlite3.connect(str(source))
+            self.conn = _connect(source, cached_statements=cached_statements)
         if row_factory is not None:
             self.conn.row_factory = row_factory
         self.cur = self.conn.cursor()
@@ -461,6 +819,8 @@ class ExecutionContext(object):
         #         setattr(self, tbl_name, TableContext(tbl, self))
         self.auto_commit = auto_commit
         self.__buckmode = False
+        # transaction status belongs to the connection and is shared with double() contexts
+        self._transaction = _TransactionState()
         self.__closed = False
 
     def double(self, **kwargs) -> 'ExecutionContext':
@@ -475,7 +835,9 @@ class ExecutionContext(object):
         ...         p = ctx.person.by_id(id)
         ...         # more complex queries go here ...
         """
-        return ExecutionContext(self.conn, self.schema, **kwargs)
+        ctx = ExecutionContext(self.conn, self.schema, **kwargs)
+        ctx._transaction = self._transaction
+        return ctx
 
     @property
     def is_open(self):
@@ -497,21 +859,57 @@ class ExecutionContext(object):
         self.__buckmode = False
         return self
 
-    def begin(self):
-        """ Start a transaction """
-        self.execute("BEGIN")
+    def begin(self, mode=None):
+        """ Start a transaction
+
+        auto_commit is suspended until commit() or rollback() is called,
+        so that all queries in between are committed together.
+
+        mode -- DEFERRED (default), IMMEDIATE or EXCLUSIVE
+        """
+        if self._transaction.active and self.conn.in_transaction:
+            raise sqlite3.OperationalError("cannot start a transaction within a transaction")
+        was_active = self._transaction.active
+        self._transaction.active = True
+        try:
+            self.execute(f"BEGIN {mode}" if mode else "BEGIN")
+        except Exception:
+            self._transaction.active = was_active
+            raise
 
     def rollback(self):
         """ Roll back a transaction """
+        self._transaction.active = False
         self.conn.rollback()
 
     def commit(self):
         """ Commit changes made in current transaction """
         if self.is_open and self.conn is not None:
+            self._transaction.active = False
             self.conn.commit()
         else:
             raise sqlite3.OperationalError("Connection was closed. commit() failed")
 
+    @contextmanager
+    def transaction(self, mode=None):
+        """ Run a block of queries in a single transaction
+
+        Changes are committed when the block finishes and rolled back if an exception is raised
+
+        >>> with db.ctx() as ctx:
+        ...     with ctx.transaction():
+        ...         for name, age in people:
+        ...             ctx.person.insert(name, age)
+        """
+        self.begin(mode)
+        try:
+            yield self
+        except Exception:
+            self.rollback()
+            raise
+        else:
+            self.commit()
+
     def vacuum(self):
         """ Clean up database
 
@@ -521,21 +919,42 @@ class ExecutionContext(object):
 
     def select(self, table, where=None, values=None, orderby=None, limit=None, columns=None):
         """ Support these keywords where, values, orderby, limit and columns"""
+        query = QueryBuilder.build_select(table, where, orderby, limit, columns)
         if isinstance(table, Table):
-            return tuple(x for x in self.select_iter(table, where, values, orderby, limit, columns))
+            rows = self._execute(self._tuple_cursor(), query, values).fetchall()
+            return table._materialize(rows, tuple, columns=columns)
         else:
-            query = QueryBuilder.build_select(table, where, orderby, limit, columns)
             return self.execute(query, values).fetchall()
 
     def select_iter(self, table, where=None, values=None, orderby=None, limit=None, columns=None):
         """ Support these keywords where, values, orderby, limit and columns"""
         query = QueryBuilder.build_select(table, where, orderby, limit, columns)
         if isinstance(table, Table):
-            for row_tuple in self.execute(query, values):
-                yield table.to_obj(row_tuple, columns=columns)
+            rows = self._execute(self._tuple_cursor(), query, values)
+            # resolve row loader once instead of once per row
+            if table._proto:
+                load, proto = table._loader_for(columns), table._proto
+                for row_tuple in rows:
+                    yield load(proto(), row_tuple)
+            else:
+                template = table._template_for(columns) if columns else table.template
+                for row_tuple in rows:
+                    yield template(*row_tuple)
         else:
             return self.execute(query, values)
 
+    def select_single(self, table, where=None, values=None, orderby=None, columns=None):
+        """ Select and return the first matched record (or None if nothing was found)
+
+        The query is limited to 1 row so that no other matched rows are fetched
+        """
+        query = QueryBuilder.build_select(table, where, orderby, 1, columns)
+        if isinstance(table, Table):
+            row_tuple = self._execute(self._tuple_cursor(), query, values).fetchone()
+            return table.to_obj(row_tuple, columns=columns) if row_tuple is not None else None
+        else:
+            return self.execute(query, values).fetchone()
+
     def insert(self, table, values=None, columns=None, **kwargs):
         if values is None:
             values = kwargs
@@ -552,37 +971,49 @@ class ExecutionContext(object):
     def insert_record(self, *args, **kwargs):
         return self.insert(*args, **kwargs)
 
+    def insert_many(self, table, rows, columns=None):
+        """ Insert many records using a single prepared INSERT query and return the number of inserted rows
+
+        All rows must have the same number of values. To avoid committing after every call,
+        wrap multiple insert_many() calls in a transaction (see begin() and transaction()).
+        """
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            return 0
+        query = QueryBuilder.build_insert(table, first, columns)
+        return self.executemany(query, chain((first,), rows)).rowcount
+
     def update_record(self, table, new_values, where='', where_values=None, columns=None):
         query = QueryBuilder.build_update_record(table, where, columns)
-        return self.execute(query, new_values + where_values if where_values else new_values)
+        return self.execute(query, (*new_values, *(where_values or ())))
 
     def delete_record(self, table, where=None, values=None):
         query = QueryBuilder.build_delete(table, where)
         return self.execute(query, values)
 
     def select_object_by_id(self, table, ids, columns=None):
-        _id_cols = table._id_cols if table._id_cols else ('rowid',)
-        where = ' AND '.join(['{c}=?'.format(c=c) for c in _id_cols])
-        return next(self.select_iter(table, where, ids, columns=columns), None)
+        where = table._id_where if table._id_cols else 'rowid=?'
+        return self.select_single(table, where, ids, columns=columns)
 
     def insert_object(self, table, obj_data, columns=None, field_map=None):
         if not columns and isinstance(table, Table):
             columns = table.columns
-        values = tuple(getattr(obj_data, field_map[colname] if field_map and colname in field_map else colname) for colname in columns)
+        values = _values_getter(table, columns, field_map)(obj_data)
         self.insert_record(table, values, columns)
         return self.cur.lastrowid
 
     def update_object(self, table, obj_data, columns=None, field_map=None):
-        where = ' AND '.join(['{c}=?'.format(c=c) for c in table._id_cols])
-        where_values = tuple(getattr(obj_data, colname) for colname in table._id_cols)
+        where = table._id_where
+        where_values = table._id_getter()(obj_data)
         if not columns:
             columns = table.columns
-        new_values = tuple(getattr(obj_data, field_map[colname] if field_map and colname in field_map else colname) for colname in columns)
+        new_values = _values_getter(table, columns, field_map)(obj_data)
         self.update_record(table, new_values, where, where_values, columns)
 
     def delete_object(self, table, obj_data):
-        where = ' AND '.join(['{c}=?'.format(c=c) for c in table._id_cols])
-        where_values = tuple(getattr(obj_data, colname) for colname in table._id_cols)
+        where = table._id_where
+        where_values = table._id_getter()(obj_data)
         self.delete_record(table, where, where_values)
 
     def query_row(self, query, params=None):
@@ -601,24 +1032,55 @@ class ExecutionContext(object):
         query = QueryBuilder.build_update(table, set_expr, where=where)
         return self.execute(query, values)
 
+    def __should_commit(self):
+        # a transaction may also be ended by executing COMMIT/ROLLBACK directly
+        in_transaction = self._transaction.active and self.conn.in_transaction
+        return self.auto_commit and not self.__buckmode and not in_transaction
+
+    def _tuple_cursor(self):
+        """ [Internal] Create a cursor which returns plain tuples instead of sqlite3.Row objects
+
+        Table rows are unpacked positionally into templates or proto objects,
+        so wrapping them in sqlite3.Row first is just wasted work.
+        """
+        # self.conn is reset to None on close(), use the cursor's connection to get a ProgrammingError instead
+        cur = self.cur.connection.cursor()
+        cur.row_factory = None
+        return cur
+
     def execute(self, query, params=None):
+        return self._execute(self.cur, query, params)
+
+    def _execute(self, cur, query, params=None):
+        """ [Internal] Execute a query using a specific cursor """
         # Try to connect to DB if not connected
         try:
             if params:
-                _r = self.cur.execute(query, params)
+                _r = cur.execute(query, params)
             else:
-                _r = self.cur.execute(query)
-            if not self.__buckmode and self.auto_commit:
+                _r = cur.execute(query)
+            if self.__should_commit():
                 self.commit()
             return _r
         except Exception:
             logging.getLogger(__name__).exception('Query failed: q={}, p={}'.format(query, params))
             raise
 
+    def executemany(self, query, seq_of_params):
+        """ Execute a query against all parameter sequences in seq_of_params """
+        try:
+            _r = self.cur.executemany(query, seq_of_params)
+            if self.__should_commit():
+                self.commit()
+            return _r
+        except Exception:
+            logging.getLogger(__name__).exception('Query failed: q={}'.format(query))
+            raise
+
     def executescript(self, query):
         """ Execute an SQL script (update, delete, etc.) """
         _r = self.cur.executescript(query)
-        if not self.__buckmode and self.auto_commit:
+        if self.__should_commit():
             self.commit()
         return _r
 
@@ -659,7 +1121,7 @@ class ExecutionContext(object):
 class Database(object):
     """ Represents a database
     """
-    def __init__(self, data_source=':memory:', setup_script=None, setup_file=None, auto_commit=True, auto_expand_path=True, strict_mode=False):
+    def __init__(self, data_source=':memory:', setup_script=None, setup_file=None, auto_commit=True, auto_expand_path=True, strict_mode=False, pragmas=None, cached_statements=256):
         if not data_source:
             data_source = ':memory:'
         if isinstance(data_source, DataSource):
@@ -667,7 +1129,7 @@ class Database(object):
             self.__data_source.auto_commit = auto_commit
             self.__data_source.schema = self
         else:
-            self.__data_source = DataSource(db_path=data_source, schema=self, auto_expand_path=auto_expand_path)
+            self.__data_source = DataSource(db_path=data_source, schema=self, auto_expand_path=auto_expand_path, pragmas=pragmas, cached_statements=cached_statements)
         self.auto_commit = auto_commit
         self.setup_files = []
         if setup_file:
@@ -691,14 +1153,17 @@ class Database(object):
         self.setup_scripts.append(setup_script)
         return self
 
-    def add_table(self, name, columns=None, proto=None, id_cols=None, alias=None, **field_map):
-        """ Add a new table design to this schema """
+    def add_table(self, name, columns=None, proto=None, id_cols=None, alias=None, use_record=False, **field_map):
+        """ Add a new table design to this schema
+
+            use_record -- Use light-weight __slots__ records instead of namedtuples for rows without proto
+        """
         if not columns:
             columns = []
         elif isinstance(columns, str):
             # warning?
             columns = columns.split()
-        tbl_obj = Table(name, *columns, data_source=self.__data_source, proto=proto, id_cols=id_cols, strict_mode=self._strict_mode, **field_map)
+        tbl_obj = Table(name, *columns, data_source=self.__data_source, proto=proto, id_cols=id_cols, strict_mode=self._strict_mode, use_record=use_record, **field_map)
         setattr(self, name, tbl_obj)
         self._tables[name] = tbl_obj
         if alias:
@@ -96,6 +96,57 @@ class TestUtilClass(unittest.TestCase):
         q = QueryBuilder.build_update_record("person", "age > ?", "name age")
         expected = "UPDATE person SET name=?, age=? WHERE age > ?"
         self.assertEqual(expected, q)
+        q = QueryBuilder.build_select("person", "age > ?", "age", 10, "name age")
+        expected = "SELECT name,age FROM person WHERE age > ? ORDER BY age LIMIT 10"
+        self.assertEqual(expected, q)
+        self.assertIs(q, QueryBuilder.build_select("person", "age > ?", "age", 10, ["name", "age"]))
+        q = QueryBuilder.build_insert("person", ("Ji", 28), columns={'ID': None, 'name': None, 'age': None}.keys())
+        expected = "INSERT INTO person (name,age) VALUES (?,?) "
+        self.assertEqual(expected, q)
+
+    def test_template_cache(self):
+        db1 = SchemaDemo()
+        db2 = SchemaDemo()
+        self.assertIs(db1.hobby.template, db2.hobby.template)
+        self.assertEqual(db1.hobby.template._fields, ('pid', 'hobby'))
+        # column names from split() strings are interned
+        self.assertIs(db1.diary.columns[2], db2.diary.columns[2])
+        self.assertIs(db1.diary.id_cols[0], db2.diary.id_cols[0])
+
+    def test_record(self):
+        db = SchemaDemo()
+        with db.ctx() as ctx:
+            rows = ctx.hobby.to_table(ctx.execute("SELECT pid, hobby FROM hobby"), use_record=True)
+            self.assertTrue(rows)
+            self.assertFalse(hasattr(rows[0], '__dict__'))
+            self.assertEqual(rows[0].hobby, rows[0][1])
+            self.assertEqual(rows[0].hobby, rows[0]['hobby'])
+            self.assertEqual(tuple(rows[0]), tuple(ctx.hobby.select()[0]))
+            names = ctx.hobby.to_table(ctx.execute("SELECT hobby FROM hobby"), columns=('hobby',), use_record=True)
+            self.assertEqual([x.hobby for x in names], [x.hobby for x in rows])
+
+    def test_record_table(self):
+        db = SchemaDemo()
+        db.add_table('hobby_rec', ['pid', 'hobby', 'class'], use_record=True)
+        db.execute("CREATE TABLE hobby_rec (pid INTEGER, hobby TEXT, class TEXT)")
+        db.hobby_rec.insert(1, 'reading', 'A')
+        db.hobby_rec.insert(2, 'coding', 'B')
+        rows = db.hobby_rec.select()
+        self.assertFalse(hasattr(rows[0], '__dict__'))
+        self.assertEqual(('pid', 'hobby', '_2'), rows[0]._fields)
+        self.assertEqual([(1, 'reading', 'A'), (2, 'coding', 'B')], [tuple(r) for r in rows])
+        r = db.hobby_rec.select_single('pid=?', (2,), columns=('hobby',))
+        self.assertEqual(('coding',), tuple(r))
+        self.assertEqual(1, len(r))
+        self.assertEqual(r, db.hobby_rec.select('pid=?', (2,), columns=('hobby',))[0])
+        self.assertIsInstance(db.hobby_rec.to_table([(3, 'x', 'C')], use_record=False)[0], tuple)
+        # slicing
+        self.assertEqual((1, 'reading'), rows[0][:2])
+        self.assertEqual(('A',), rows[0][-1:])
+        # records are mutable and therefore not hashable
+        rows[0].hobby = 'writing'
+        self.assertEqual('writing', rows[0][1])
+        self.assertRaises(TypeError, lambda: hash(rows[0]))
 
     def test_to_obj(self):
         class Tool:
@@ -279,6 +330,20 @@ class TestSchema(unittest.TestCase):
         persons = db.person.select()
         self.assertEqual(1106, len(persons))
 
+    def test_insert_many(self):
+        db = SchemaDemo()
+        with db.ctx() as ctx:
+            ctx.auto_commit = False
+            ctx.begin()
+            inserted = ctx.person.insert_many((f"Person {i}", i) for i in range(100))
+            ctx.commit()
+            self.assertEqual(100, inserted)
+            self.assertEqual(106, len(ctx.person.select()))
+            self.assertEqual(0, ctx.person.insert_many([]))
+        inserted = db.hobby.insert_many([(1, 'reading'), (2, 'running')], columns=('pid', 'hobby'))
+        self.assertEqual(2, inserted)
+        self.assertEqual({'reading'}, {h.hobby for h in db.hobby.select('pid=?', (1,))})
+
     def test_vacuum(self):
         db = SchemaDemo()
         persons = db.person.select()
@@ -319,6 +384,46 @@ class TestSchema(unittest.TestCase):
                         break
                 self.assertTrue(_found)
 
+    def test_transaction(self):
+        db = SchemaDemo()
+        with db.ctx() as ctx:
+            ctx.begin()
+            ctx.person.insert('Totoro', 10)
+            ctx.person.insert('Satsuki', 11)
+            self.assertEqual(8, len(ctx.person.select()))
+            ctx.rollback()
+            self.assertEqual(6, len(ctx.person.select()))
+            with ctx.transaction('IMMEDIATE'):
+                ctx.person.insert('Totoro', 10)
+                ctx.person.insert('Satsuki', 11)
+            self.assertEqual(8, len(ctx.person.select()))
+            with self.assertRaises(ValueError):
+                with ctx.transaction():
+                    ctx.person.insert('Mei', 4)
+                    raise ValueError()
+            self.assertEqual(8, len(ctx.person.select()))
+            # queries from a double() context must not commit the shared transaction
+            with self.assertRaises(ValueError):
+                with ctx.transaction():
+                    ctx.person.insert('Mei', 4)
+                    list(ctx.double(row_factory=None).execute("SELECT name FROM person"))
+                    raise ValueError()
+            self.assertEqual(8, len(ctx.person.select()))
+            # nested begin() is refused and must not end the current transaction
+            ctx.begin()
+            ctx.person.insert('Mei', 4)
+            self.assertRaises(sqlite3.OperationalError, lambda: ctx.begin())
+            ctx.person.insert('Kanta', 12)
+            with self.assertRaises(sqlite3.OperationalError):
+                with ctx.transaction():
+                    pass
+            ctx.rollback()
+            self.assertEqual(8, len(ctx.person.select()))
+            # auto_commit is back on
+            ctx.person.insert('Mei', 4)
+            ctx.rollback()
+            self.assertEqual(9, len(ctx.person.select()))
+
     def test_proto(self):
         ds = DataSource(':memory:')
         s = SchemaDemo(ds)
@@ -336,6 +441,10 @@ class TestSchema(unittest.TestCase):
         # select tuple
         h = s.hobby.select_single()
         self.assertIsInstance(h, tuple)
+        self.assertEqual(tuple(s.query_row("SELECT pid, hobby FROM hobby ORDER BY hobby DESC")),
+                         tuple(s.hobby.select_single(orderby='hobby DESC')))
+        self.assertEqual(tuple(s.select_single('hobby')), tuple(h))
+        self.assertIsNone(s.select_single('hobby', 'pid=?', (-1,)))
         school = s.school.select_single()  # first object
         # test to_obj
         objs = s.select(s.school)  # all records
@@ -382,6 +491,64 @@ class TestRamDB(unittest.TestCase):
             logging.getLogger(__name__).info("Test DB exists, removing it now")
             os.unlink(TEST_DB)
 
+    def test_pragmas(self):
+        db = SchemaDemo(TEST_DB)
+        # no pragma is sent by default
+        self.assertEqual('delete', db.query_scalar("PRAGMA journal_mode"))
+        self.assertFalse(os.path.isfile(f"{TEST_DB}-wal"))
+        ds = DataSource(TEST_DB, pragmas={'synchronous': 'OFF'})
+        with ds.open() as ctx:
+            self.assertEqual(0, ctx.query_scalar("PRAGMA synchronous"))
+        db.close()
+
+    def test_read_only_db(self):
+        ro_db = TEST_DATA / 'test_ro.db'
+        if ro_db.is_file():
+            ro_db.unlink()
+        conn = sqlite3.connect(str(ro_db))
+        conn.executescript("CREATE TABLE t(a INTEGER); INSERT INTO t VALUES (1); INSERT INTO t VALUES (2);")
+        conn.close()
+        try:
+            for pragmas in (None, {'journal_mode': 'WAL', 'synchronous': 'NORMAL'}):
+                db = Database(f"file:{ro_db}?mode=ro", pragmas=pragmas)
+                db.add_table('t', ['a'])
+                self.assertEqual([1, 2], [r.a for r in db.t.select()])
+                self.assertEqual('delete', db.query_scalar("PRAGMA journal_mode"))
+                db.close()
+            # MemorySource accepts URIs too
+            mem_db = Database(MemorySource(f"file:{ro_db}?mode=ro"))
+            mem_db.add_table('t', ['a'])
+            self.assertEqual([1, 2], [r.a for r in mem_db.t.select()])
+            mem_db.close()
+        finally:
+            ro_db.unlink()
+
+    def test_uri_setup(self):
+        uri_db = TEST_DATA / 'test_uri.db'
+        if uri_db.is_file():
+            uri_db.unlink()
+        try:
+            db = Database(f"file:{uri_db}?mode=rwc", setup_script="CREATE TABLE t(a INTEGER); INSERT INTO t VALUES (1);")
+            db.add_table('t', ['a'])
+            self.assertEqual([1], [r.a for r in db.t.select()])
+            db.close()
+            # existing database is not set up again
+            db = Database(f"file:{uri_db}?mode=rwc", setup_script="CREATE TABLE t(a INTEGER);")
+            db.add_table('t', ['a'])
+            self.assertEqual([1], [r.a for r in db.t.select()])
+            db.close()
+        finally:
+            uri_db.unlink()
+
+    def test_recreate_deleted_db(self):
+        db = SchemaDemo(TEST_DB)
+        with db.ctx() as ctx:
+            self.assertEqual(6, len(ctx.person.select()))
+        db.close()
+        os.unlink(TEST_DB)
+        with db.ctx() as ctx:
+            self.assertEqual(6, len(ctx.person.select()))
+
     def test_memory_ds(self):
         # prepare a sample DB
         db = SchemaDemo(TEST_DB)
@@ -400,7 +567,16 @@ class TestRamDB(unittest.TestCase):
         ctx = db_ram.open()
         self.assertEqual(7, len(ctx.person.select()))
         db_ram.close()
-        self.assertRaises(sqlite3.ProgrammingError, lambda: db_ram.person.select())
+        # contexts on the dropped in-memory database are closed
+        self.assertRaises(sqlite3.ProgrammingError, lambda: ctx.person.select())
+        # the database is fetched from file again, changes made in RAM are gone
+        self.assertEqual(6, len(db_ram.person.select()))
+        # closing any context closes the shared connection, a new one is fetched on open()
+        with db_ram.ctx() as ctx:
+            ctx.person.insert("Emacs", emacs_age)
+            self.assertEqual(7, len(ctx.person.select()))
+        with db_ram.ctx() as ctx:
+            self.assertEqual(6, len(ctx.person.select()))
 
 
 class TestDemoLib(unittest.TestCase):
@@ -548,6 +724,33 @@ class TestDemoLib(unittest.TestCase):
             self.assertEqual(p2n.age, 29)
             self.assertEqual(p2n.ID, p2.ID)
 
+    def test_to_table_proto(self):
+        db = SchemaDemo()
+        with db.ctx() as ctx:
+            diaries = ctx.diary.to_table([(1, 5, 'Hello'), (2, 4, 'World')])
+            self.assertTrue(all(isinstance(d, Diary) for d in diaries))
+            self.assertEqual([(d.ID, d.ownerID, d.content) for d in diaries], [(1, 5, 'Hello'), (2, 4, 'World')])
+            self.assertEqual([], ctx.diary.to_table([]))
+            self.assertEqual([], ctx.hobby.to_table(()))
+            self.assertEqual((), ctx.hobby.select('pid=?', (-1,)))
+            persons = ctx.person.to_table(ctx.double(row_factory=None).execute("SELECT name, age FROM person"), columns=('name', 'age'))
+            self.assertEqual([(p.ID, p.name) for p in persons[:2]], [(None, 'Ji'), (None, 'Zen')])
+
+    def test_dotted_field_mapping(self):
+        class Note:
+            pass
+        db = Database(setup_script="CREATE TABLE note(ID INTEGER PRIMARY KEY, body TEXT)")
+        db.add_table('note', ['ID', 'body'], proto=Note, id_cols='ID', body='note.body')
+        n = Note()
+        n.ID = None
+        setattr(n, 'note.body', 'Hello')
+        nid = db.note.save(n)
+        n2 = db.note.by_id(nid)
+        self.assertEqual('Hello', getattr(n2, 'note.body'))
+        setattr(n2, 'note.body', 'World')
+        db.note.save(n2)
+        self.assertEqual('World', getattr(db.note.by_id(nid), 'note.body'))
+
     def test_field_mapping(self):
         content = 'I am better than Emacs'
         new_content = 'I am NOT better than Emacs'
@@ -709,6 +912,19 @@ class TestWithContext(unittest.TestCase):
         db.close()
         del db
 
+    def test_close_ds(self):
+        if TEST_DB.is_file():
+            TEST_DB.unlink()
+        db = SchemaDemo(TEST_DB)
+        db.person.insert('Totoro', 10)
+        self.assertEqual(7, len(db.person.select()))
+        db.close()
+        # a new default context is opened after close()
+        self.assertEqual(7, len(db.person.select()))
+        db.close()
+        db.close()  # closing again is safe
+        os.unlink(TEST_DB)
+
     def test_default_context(self):
         db = SchemaDemo()
         print("Select persons ...")